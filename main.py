@@ -4,11 +4,25 @@ from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QLineEdit, QMessageBox, QTableWidgetItem, QHeaderView,
                            QMenu, QStyle, QHBoxLayout, QLabel, QFrame)
 from PySide6.QtCore import QTimer, Qt, QSize
-from PySide6.QtGui import QAction, QIcon, QColor, QPalette
+from PySide6.QtGui import QAction, QIcon, QColor, QPalette, QBrush
 import pyotp
 from database import Database
+import csv
 import hashlib
+import io
+import os
+import shutil
+import sqlite3
 import time
+from contextlib import closing
+from functools import partial
+
+# Resolved once at startup, so the salt always sits next to the database
+DB_PATH = os.path.abspath('passwords.db')
+
+# Master password key derivation
+SALT_FILE = os.path.join(os.path.dirname(DB_PATH), 'passwords.salt')
+KDF_ITERATIONS = 200_000
 
 DARK_STYLE = """
 QMainWindow, QDialog, QMessageBox {
@@ -56,6 +70,92 @@ QMenu::item:selected {
 }
 """
 
+DIALOG_STYLE = """
+QDialog {
+    background-color: #1e1e1e;
+}
+QLineEdit {
+    background-color: #2d2d2d;
+    color: #ffffff;
+    border: 1px solid #3d3d3d;
+    padding: 8px;
+    border-radius: 4px;
+}
+QLabel {
+    color: #ffffff;
+}
+"""
+
+BUTTON_STYLE = """
+StyledButton {
+    background-color: #0d47a1;
+    color: white;
+    border: none;
+    padding: 8px 16px;
+    border-radius: 4px;
+    font-size: 14px;
+}
+StyledButton:hover {
+    background-color: #1565c0;
+}
+StyledButton:pressed {
+    background-color: #0a3880;
+}
+"""
+
+CANCEL_BUTTON_STYLE = """
+QPushButton#cancelButton {
+    background-color: #2d2d2d;
+    color: #ffffff;
+    border: 1px solid #3d3d3d;
+    padding: 8px 16px;
+    border-radius: 4px;
+    font-size: 14px;
+}
+QPushButton#cancelButton:hover {
+    background-color: #3d3d3d;
+}
+"""
+
+def load_salt(path=SALT_FILE):
+    """Return the KDF salt stored next to the database, or None if there is none."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def save_salt(salt, path=SALT_FILE):
+    """Write the KDF salt atomically, so a crash can't leave a truncated file."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(salt)
+    os.replace(tmp_path, path)
+
+class VaultUpgradeError(Exception):
+    """Raised when a legacy vault can't be re-keyed without losing accounts."""
+
+def derive_master_key(master_password, salt):
+    """Stretch the master password into the hex key Database takes."""
+    # Hex, like the legacy SHA-256 key, so Database always receives a str
+    return hashlib.pbkdf2_hmac('sha256', master_password.encode(), salt, KDF_ITERATIONS).hex()
+
+# Shared cell text and brushes, built once instead of per row
+_MASK = '••••••••'
+_WHITE_BRUSH = QBrush(QColor('#ffffff'))
+_GRAY_BRUSH = QBrush(QColor('#808080'))
+_HIGHLIGHT_BRUSH = QBrush(QColor('#1565c0'))
+_CELL_BACKGROUND_BRUSH = QBrush(QColor('#2d2d2d'))
+
+_ICON_CACHE = {}
+
+def standard_icon(pixmap):
+    """Return the application style's standard icon, looked up once per pixmap."""
+    icon = _ICON_CACHE.get(pixmap)
+    if icon is None:
+        icon = _ICON_CACHE[pixmap] = QApplication.style().standardIcon(pixmap)
+    return icon
+
 class CustomTableWidget(QTableWidget):
     def __init__(self):
         super().__init__()
@@ -100,29 +200,26 @@ class CustomTableWidget(QTableWidget):
                     text = current_item.text()
                 QApplication.clipboard().setText(text)
             
+    def row_value(self, col, item):
+        if col == 2:  # Password column
+            return item.data(Qt.ItemDataRole.UserRole)
+        if col == 3:  # OTP column
+            text = item.text()
+            return text.split()[0] if text != 'N/A' else 'N/A'
+        return item.text()
+            
     def copy_row_content(self, format="tab"):
         current_row = self.currentRow()
         if current_row >= 0:
-            row_data = []
-            for col in range(self.columnCount()):
-                item = self.item(current_row, col)
-                if item:
-                    if col == 2:  # Password column
-                        value = item.data(Qt.ItemDataRole.UserRole)
-                    elif col == 3:  # OTP column
-                        value = item.text().split()[0] if item.text() != 'N/A' else 'N/A'
-                    else:
-                        value = item.text()
-                    row_data.append(value)
+            ncols = self.columnCount()
+            items = [self.item(current_row, col) for col in range(ncols)]
+            row_data = [self.row_value(col, item) for col, item in enumerate(items) if item]
             
             if format == "csv":
-                # Escape commas and quotes in values
-                escaped_data = []
-                for value in row_data:
-                    if ',' in value or '"' in value:
-                        value = f'"{value.replace('"', '""')}"'
-                    escaped_data.append(value)
-                text = ','.join(escaped_data)
+                # Let the csv module handle quoting of commas, quotes and newlines
+                buffer = io.StringIO()
+                csv.writer(buffer).writerow(row_data)
+                text = buffer.getvalue().rstrip('\r\n')
             else:  # tab format
                 text = '\t'.join(row_data)
                 
@@ -131,45 +228,14 @@ class CustomTableWidget(QTableWidget):
 class StyledButton(QPushButton):
     def __init__(self, text, icon_name=None):
         super().__init__(text)
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: #0d47a1;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #1565c0;
-            }
-            QPushButton:pressed {
-                background-color: #0a3880;
-            }
-        """)
         if icon_name:
-            self.setIcon(self.style().standardIcon(icon_name))
+            self.setIcon(standard_icon(icon_name))
         self.setCursor(Qt.CursorShape.PointingHandCursor)
 
 class LoginDialog(QDialog):
     def __init__(self):
         super().__init__()
         self.setWindowTitle('Login - Password Manager')
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #1e1e1e;
-            }
-            QLineEdit {
-                background-color: #2d2d2d;
-                color: #ffffff;
-                border: 1px solid #3d3d3d;
-                padding: 8px;
-                border-radius: 4px;
-            }
-            QLabel {
-                color: #ffffff;
-            }
-        """)
         
         layout = QVBoxLayout()
         
@@ -196,21 +262,6 @@ class AddAccountDialog(QDialog):
     def __init__(self):
         super().__init__()
         self.setWindowTitle('Add New Account')
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #1e1e1e;
-            }
-            QLineEdit {
-                background-color: #2d2d2d;
-                color: #ffffff;
-                border: 1px solid #3d3d3d;
-                padding: 8px;
-                border-radius: 4px;
-            }
-            QLabel {
-                color: #ffffff;
-            }
-        """)
         
         layout = QVBoxLayout()
         
@@ -235,19 +286,7 @@ class AddAccountDialog(QDialog):
         buttons_layout = QHBoxLayout()
         save_button = StyledButton('Save')
         cancel_button = QPushButton('Cancel')
-        cancel_button.setStyleSheet("""
-            QPushButton {
-                background-color: #2d2d2d;
-                color: #ffffff;
-                border: 1px solid #3d3d3d;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #3d3d3d;
-            }
-        """)
+        cancel_button.setObjectName('cancelButton')
         
         save_button.clicked.connect(self.accept)
         cancel_button.clicked.connect(self.reject)
@@ -262,29 +301,90 @@ class AddAccountDialog(QDialog):
 class PasswordManager(QMainWindow):
     def __init__(self):
         super().__init__()
+        self._accounts_cache = None
+        self._accounts_dirty = True
         self.authenticate()
         
     def authenticate(self):
+        dialog = LoginDialog()
         while True:
-            dialog = LoginDialog()
             if dialog.exec():
                 master_password = dialog.password_input.text()
-                master_password_hash = hashlib.sha256(master_password.encode()).hexdigest()
                 try:
-                    self.setup_ui(master_password_hash)
+                    self.setup_ui(self.open_database(master_password))
                     break
                 except ValueError as e:
                     QMessageBox.critical(self, 'Error', 'Invalid master password. Please try again.')
+                    # Reuse the same dialog for the next attempt
+                    dialog.password_input.clear()
+                    dialog.password_input.setFocus()
             else:
                 sys.exit()
             
-    def setup_ui(self, master_password_hash):
+    def open_database(self, master_password):
+        """Open the vault, upgrading one keyed with the old plain SHA-256 hash."""
+        salt = load_salt()
+        if salt is None and not os.path.exists(DB_PATH):
+            # First run: the new vault gets a fresh salt
+            salt = os.urandom(16)
+            save_salt(salt)
+        if salt is not None:
+            try:
+                return Database(derive_master_key(master_password, salt), DB_PATH)
+            except ValueError:
+                pass
+        # Raises ValueError if this isn't the legacy password either
+        legacy_key = hashlib.sha256(master_password.encode()).hexdigest()
+        legacy_db = Database(legacy_key, DB_PATH)
+        try:
+            return self.rekey_database(legacy_db, master_password, salt or os.urandom(16))
+        except VaultUpgradeError as e:
+            QMessageBox.warning(self, 'Warning', f'Your vault was not upgraded: {e}')
+            return Database(legacy_key, DB_PATH)
+
+    def rekey_database(self, legacy_db, master_password, salt):
+        """Copy a legacy vault's accounts into one keyed with PBKDF2 and swap it in."""
+        master_key = derive_master_key(master_password, salt)
+        accounts = legacy_db.get_accounts()
+        legacy_db.close()
+        
+        # get_accounts skips rows it can't decrypt; copying only the rest would lose them
+        with closing(sqlite3.connect(DB_PATH)) as conn:
+            row_count = conn.execute('SELECT COUNT(*) FROM accounts').fetchone()[0]
+        if len(accounts) != row_count:
+            raise VaultUpgradeError(f'{row_count - len(accounts)} accounts could not be decrypted')
+        
+        new_path = DB_PATH + '.rekey'
+        if os.path.exists(new_path):
+            os.remove(new_path)
+        new_db = Database(master_key, new_path)
+        for account in accounts:
+            new_db.add_account(account['name'], account['username'],
+                               account['password'], account['otp_secret'])
+        copied = len(new_db.get_accounts())
+        new_db.close()
+        if copied != len(accounts):
+            os.remove(new_path)
+            raise VaultUpgradeError(f'only {copied} of {len(accounts)} accounts were copied')
+        
+        # Salt first: if we stop before the swap, the old vault still opens
+        # through the legacy path and the upgrade is simply retried
+        save_salt(salt)
+        backup_path = DB_PATH + '.bak'
+        shutil.copy2(DB_PATH, backup_path)
+        os.replace(new_path, DB_PATH)
+        
+        db = Database(master_key, DB_PATH)
+        if len(db.get_accounts()) == len(accounts):
+            # The backup is only protected by the weak legacy key
+            os.remove(backup_path)
+        return db
+
+    def setup_ui(self, db):
         self.setWindowTitle('Password Manager')
         self.setGeometry(100, 100, 1000, 600)
-        self.setStyleSheet(DARK_STYLE)
         
-        # Initialize database
-        self.db = Database(master_password_hash)
+        self.db = db
         
         # Main widget and layout
         central_widget = QWidget()
@@ -321,12 +421,19 @@ class PasswordManager(QMainWindow):
         add_button.clicked.connect(self.add_account)
         self.table.itemDoubleClicked.connect(self.handle_item_double_click)
         
-        # Setup OTP timer
+        # Setup OTP timers: codes refresh on the 30 s boundary,
+        # the countdown tooltip ticks every second
+        self.otp_refresh_timer = QTimer()
+        self.otp_refresh_timer.setSingleShot(True)
+        self.otp_refresh_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.otp_refresh_timer.timeout.connect(self.refresh_all_otps)
+        
         self.otp_timer = QTimer()
-        self.otp_timer.timeout.connect(self.update_otp_codes)
+        self.otp_timer.timeout.connect(self.update_otp_tooltips)
         self.otp_timer.start(1000)  # Update every second
         
         self.load_accounts()
+        self.schedule_otp_refresh()
 
     def handle_item_double_click(self, item):
         row = item.row()
@@ -335,7 +442,6 @@ class PasswordManager(QMainWindow):
         if col in [0, 1]:  # Only allow editing account name and username
             dialog = QDialog(self)
             dialog.setWindowTitle('Edit Value')
-            dialog.setStyleSheet(DARK_STYLE)
             layout = QVBoxLayout(dialog)
             
             input_field = QLineEdit()
@@ -345,18 +451,7 @@ class PasswordManager(QMainWindow):
             buttons = QHBoxLayout()
             save_btn = StyledButton('Save')
             cancel_btn = QPushButton('Cancel')
-            cancel_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #2d2d2d;
-                    color: #ffffff;
-                    border: 1px solid #3d3d3d;
-                    padding: 8px 16px;
-                    border-radius: 4px;
-                }
-                QPushButton:hover {
-                    background-color: #3d3d3d;
-                }
-            """)
+            cancel_btn.setObjectName('cancelButton')
             
             buttons.addWidget(cancel_btn)
             buttons.addWidget(save_btn)
@@ -370,18 +465,19 @@ class PasswordManager(QMainWindow):
                 item.setText(new_value)
                 
                 # Update database
-                account = self.db.get_accounts()[row]
+                account = self._accounts()[row]
                 if col == 0:
                     self.db.update_account(account['id'], new_value, account['username'], 
                                          account['password'], account['otp_secret'])
+                    account['name'] = new_value
                 else:
                     self.db.update_account(account['id'], account['name'], new_value,
                                          account['password'], account['otp_secret'])
+                    account['username'] = new_value
         
         elif col == 2:  # Password column
             dialog = QDialog(self)
             dialog.setWindowTitle('Edit Password')
-            dialog.setStyleSheet(DARK_STYLE)
             layout = QVBoxLayout(dialog)
             
             # Current password field
@@ -392,9 +488,9 @@ class PasswordManager(QMainWindow):
             current_password.setPlaceholderText('Current Password')
             
             show_current = QPushButton()
-            show_current.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_DialogYesButton))
+            show_current.setIcon(standard_icon(QStyle.StandardPixmap.SP_DialogYesButton))
             show_current.setCheckable(True)
-            show_current.clicked.connect(lambda: self.toggle_password_visibility(current_password))
+            show_current.clicked.connect(partial(self.toggle_password_visibility, current_password))
             
             current_layout.addWidget(current_password)
             current_layout.addWidget(show_current)
@@ -407,9 +503,9 @@ class PasswordManager(QMainWindow):
             new_password.setPlaceholderText('New Password')
             
             show_new = QPushButton()
-            show_new.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_DialogYesButton))
+            show_new.setIcon(standard_icon(QStyle.StandardPixmap.SP_DialogYesButton))
             show_new.setCheckable(True)
-            show_new.clicked.connect(lambda: self.toggle_password_visibility(new_password))
+            show_new.clicked.connect(partial(self.toggle_password_visibility, new_password))
             
             new_layout.addWidget(new_password)
             new_layout.addWidget(show_new)
@@ -418,18 +514,7 @@ class PasswordManager(QMainWindow):
             buttons = QHBoxLayout()
             save_btn = StyledButton('Save')
             cancel_btn = QPushButton('Cancel')
-            cancel_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #2d2d2d;
-                    color: #ffffff;
-                    border: 1px solid #3d3d3d;
-                    padding: 8px 16px;
-                    border-radius: 4px;
-                }
-                QPushButton:hover {
-                    background-color: #3d3d3d;
-                }
-            """)
+            cancel_btn.setObjectName('cancelButton')
             
             buttons.addWidget(cancel_btn)
             buttons.addWidget(save_btn)
@@ -442,12 +527,15 @@ class PasswordManager(QMainWindow):
                 new_value = new_password.text()
                 if new_value:  # Only update if new password is not empty
                     item.setData(Qt.ItemDataRole.UserRole, new_value)
-                    item.setText('••••••••')
+                    item.setText(_MASK)
                     
-                    # Update database
-                    account = self.db.get_accounts()[row]
-                    self.db.update_account(account['id'], account['name'], account['username'],
-                                         new_value, account['otp_secret'])
+                    # Update database, taking name and username from the row
+                    name = self.table.item(row, 0).text()
+                    username = self.table.item(row, 1).text()
+                    account = self._accounts()[row]
+                    self.db.update_account(account['id'], name, username, new_value,
+                                         account['otp_secret'])
+                    account['password'] = new_value
 
     def toggle_password_visibility(self, password_field):
         if password_field.echoMode() == QLineEdit.EchoMode.Password:
@@ -455,59 +543,117 @@ class PasswordManager(QMainWindow):
         else:
             password_field.setEchoMode(QLineEdit.EchoMode.Password)
 
-    def load_accounts(self):
-        accounts = self.db.get_accounts()
-        self.table.setRowCount(len(accounts))
+    def _accounts(self):
+        # Cached so row lookups only hit the database after add/delete;
+        # edits patch the cached entry in place
+        if self._accounts_dirty:
+            self._accounts_cache = self.db.get_accounts()
+            self._accounts_dirty = False
+        return self._accounts_cache
         
-        for row, account in enumerate(accounts):
-            name_item = QTableWidgetItem(account['name'])
-            name_item.setForeground(QColor('#ffffff'))
-            self.table.setItem(row, 0, name_item)
+    def load_accounts(self):
+        accounts = self._accounts()
+        
+        # One TOTP per row, plus the 30 s window its code was computed for
+        self._totps = {}
+        self._otp_window = {}
+        now = int(time.time())
+        window = now // 30
+        remaining = 30 - (now % 30)
+        self._last_remaining = remaining
+        
+        # Populate in one batch: no repaints, signals or column
+        # re-stretching until every row is in place
+        header = self.table.horizontalHeader()
+        sorting_enabled = self.table.isSortingEnabled()
+        self.table.setSortingEnabled(False)
+        self.table.setUpdatesEnabled(False)
+        self.table.blockSignals(True)
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        try:
+            self.table.setRowCount(len(accounts))
+            
+            for row, account in enumerate(accounts):
+                name_item = QTableWidgetItem(account['name'])
+                name_item.setForeground(_WHITE_BRUSH)
+                self.table.setItem(row, 0, name_item)
             
-            username_item = QTableWidgetItem(account['username'])
-            username_item.setForeground(QColor('#ffffff'))
-            self.table.setItem(row, 1, username_item)
+                username_item = QTableWidgetItem(account['username'])
+                username_item.setForeground(_WHITE_BRUSH)
+                self.table.setItem(row, 1, username_item)
             
-            password_item = QTableWidgetItem('••••••••')
-            password_item.setData(Qt.ItemDataRole.UserRole, account['password'])
-            password_item.setForeground(QColor('#ffffff'))
-            self.table.setItem(row, 2, password_item)
+                password_item = QTableWidgetItem(_MASK)
+                password_item.setData(Qt.ItemDataRole.UserRole, account['password'])
+                password_item.setForeground(_WHITE_BRUSH)
+                self.table.setItem(row, 2, password_item)
             
-            if account['otp_secret']:
-                totp = pyotp.TOTP(account['otp_secret'])
-                otp_code = totp.now()
-                remaining = 30 - (int(time.time()) % 30)
-                otp_item = QTableWidgetItem(f'{otp_code}')
-                otp_item.setData(Qt.ItemDataRole.UserRole, account['otp_secret'])
-                otp_item.setForeground(QColor('#ffffff'))
+                if account['otp_secret']:
+                    totp = pyotp.TOTP(account['otp_secret'])
+                    otp_code = totp.at(window * 30)
+                    self._totps[row] = totp
+                    self._otp_window[row] = window
+                    otp_item = QTableWidgetItem(otp_code)
+                    otp_item.setData(Qt.ItemDataRole.UserRole, account['otp_secret'])
+                    otp_item.setForeground(_WHITE_BRUSH)
                 
-                # Add remaining time as tooltip
-                otp_item.setToolTip(f'Refreshes in {remaining} seconds')
+                    # Add remaining time as tooltip
+                    otp_item.setToolTip(f'Refreshes in {remaining} seconds')
                 
-                self.table.setItem(row, 3, otp_item)
-            else:
-                otp_item = QTableWidgetItem('N/A')
-                otp_item.setForeground(QColor('#808080'))
-                self.table.setItem(row, 3, otp_item)
+                    self.table.setItem(row, 3, otp_item)
+                else:
+                    otp_item = QTableWidgetItem('N/A')
+                    otp_item.setForeground(_GRAY_BRUSH)
+                    self.table.setItem(row, 3, otp_item)
+        finally:
+            header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+            self.table.blockSignals(False)
+            self.table.setUpdatesEnabled(True)
+            self.table.setSortingEnabled(sorting_enabled)
             
-    def update_otp_codes(self):
-        for row in range(self.table.rowCount()):
-            otp_item = self.table.item(row, 3)
-            if otp_item and otp_item.text() != 'N/A':
-                otp_secret = otp_item.data(Qt.ItemDataRole.UserRole)
-                if otp_secret:
-                    totp = pyotp.TOTP(otp_secret)
-                    otp_code = totp.now()
-                    remaining = 30 - (int(time.time()) % 30)
+    def schedule_otp_refresh(self):
+        # Land just past the next boundary so the new window is current
+        remaining_ms = (30 - time.time() % 30) * 1000
+        self.otp_refresh_timer.start(int(remaining_ms) + 50)
+        
+    def refresh_all_otps(self):
+        window = int(time.time()) // 30
+        
+        # The code only changes once per 30 s window; only rows whose
+        # window moved are touched, with a single repaint at the end
+        viewport_rect = self.table.viewport().rect()
+        self.table.setUpdatesEnabled(False)
+        self.table.blockSignals(True)
+        try:
+            for row, totp in self._totps.items():
+                if self._otp_window[row] != window:
+                    self._otp_window[row] = window
+                    otp_item = self.table.item(row, 3)
+                    otp_item.setText(totp.at(window * 30))
                     
-                    # Update only the OTP code, keep it clean
-                    otp_item.setText(f'{otp_code}')
+                    # Visual feedback when OTP refreshes, only for rows on screen
+                    if viewport_rect.intersects(self.table.visualItemRect(otp_item)):
+                        otp_item.setBackground(_HIGHLIGHT_BRUSH)
+                        QTimer.singleShot(1000, lambda item=otp_item: item.setBackground(_CELL_BACKGROUND_BRUSH))
+        finally:
+            self.table.blockSignals(False)
+            self.table.setUpdatesEnabled(True)
+        
+        self.schedule_otp_refresh()
+        
+    def update_otp_tooltips(self):
+        remaining = 30 - (int(time.time()) % 30)
+        if remaining == self._last_remaining:
+            return
+        self._last_remaining = remaining
+        
+        self.table.blockSignals(True)
+        try:
+            for row in self._totps:
+                otp_item = self.table.item(row, 3)
+                if otp_item:
                     otp_item.setToolTip(f'Refreshes in {remaining} seconds')
-                    
-                    # Visual feedback when OTP refreshes
-                    if remaining == 30:
-                        otp_item.setBackground(QColor('#1565c0'))
-                        QTimer.singleShot(1000, lambda item=otp_item: item.setBackground(QColor('#2d2d2d')))
+        finally:
+            self.table.blockSignals(False)
 
     def add_account(self):
         dialog = AddAccountDialog()
@@ -519,27 +665,33 @@ class PasswordManager(QMainWindow):
             
             if name and username and password:
                 self.db.add_account(name, username, password, otp_secret)
+                self._accounts_dirty = True
                 self.load_accounts()
             else:
                 QMessageBox.warning(self, 'Error', 'Please fill in all required fields')
                 
     def delete_account(self, row):
-        account_id = self.db.get_accounts()[row]['id']
+        account_id = self._accounts()[row]['id']
         reply = QMessageBox.question(self, 'Confirm Deletion',
                                    'Are you sure you want to delete this account?',
                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         
         if reply == QMessageBox.StandardButton.Yes:
             self.db.delete_account(account_id)
+            self._accounts_dirty = True
             self.load_accounts()
             
     def closeEvent(self, event):
+        self.otp_refresh_timer.stop()
+        self.otp_timer.stop()
         self.db.close()
         event.accept()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
+    # Styles are applied once for the whole application
+    app.setStyleSheet(DARK_STYLE + DIALOG_STYLE + BUTTON_STYLE + CANCEL_BUTTON_STYLE)
     window = PasswordManager()
     window.show()
     sys.exit(app.exec())
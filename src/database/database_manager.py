@@ -2,40 +2,200 @@
 Database manager module for handling all database operations.
 """
 import sqlite3
-from typing import Dict, List, Optional
+from contextlib import closing
+from functools import lru_cache
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
 from cryptography.fernet import Fernet
+from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.ciphers import algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 import base64
+import hmac
+import itertools
 import os
 import logging
+import threading
+
+try:
+    # Optional C implementation, API-compatible with hashlib's
+    from fastpbkdf2 import pbkdf2_hmac
+except ImportError:
+    from hashlib import pbkdf2_hmac
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _aes_gcm_supported() -> bool:
+    """
+    Check that the cryptography backend provides AES-GCM.
+    
+    Returns:
+        bool: True if AES-GCM encryption is available
+    """
+    backend = default_backend()
+    supported = backend.cipher_supported(algorithms.AES(bytes(32)), modes.GCM(bytes(12)))
+    if not supported:
+        logger.warning(f"AES-GCM is not available in {backend.openssl_version_text()}")
+    return supported
+
+AES_GCM_SUPPORTED = _aes_gcm_supported()
+
+# AES-GCM values are stored as version || nonce || ciphertext+tag. Fernet
+# tokens start with base64 text ("gAAAA..."), so the version byte tells
+# them apart from rows written by older versions.
+_AES_GCM_VERSION = b'\x01'
+_AES_GCM_NONCE_SIZE = 12
+_AES_GCM_KEY_INFO = b'py-account-manager aes-gcm'
+
+# Connections are shared by every DatabaseManager open on the same file
+# and closed when the last of them closes. Each has its own lock that
+# serializes writes and their commits.
+_CONN_CACHE: Dict[Hashable, Tuple[sqlite3.Connection, threading.Lock]] = {}
+_CONN_USERS: Dict[Hashable, int] = {}
+_CONN_LOCK = threading.Lock()
+_PRIVATE_CONN_IDS = itertools.count()
+
+def _connection_key(db_path: str) -> Hashable:
+    """
+    Get the key a database's connection is shared under.
+    
+    Files are shared by absolute path. In-memory databases and URIs are
+    opened as given, under a key of their own, so they are never shared.
+    
+    Args:
+        db_path (str): Path to the SQLite database file, ':memory:' or a file: URI
+        
+    Returns:
+        Hashable: Key for _acquire_connection and _release_connection
+    """
+    if db_path == ':memory:' or db_path.startswith('file:'):
+        return (db_path, next(_PRIVATE_CONN_IDS))
+    return os.path.abspath(db_path)
+
+def _acquire_connection(conn_key: Hashable, db_path: str) -> Tuple[sqlite3.Connection, threading.Lock]:
+    """
+    Get the shared connection for a database file, opening it on first use.
+    
+    Args:
+        conn_key (Hashable): Key from _connection_key
+        db_path (str): Path to the SQLite database file, ':memory:' or a file: URI
+        
+    Returns:
+        Tuple[sqlite3.Connection, threading.Lock]: Connection usable from any
+            thread, and the lock guarding writes on it
+    """
+    with _CONN_LOCK:
+        shared = _CONN_CACHE.get(conn_key)
+        if shared is None:
+            # Opened on a worker thread by the GUI and used from the main thread after
+            conn = sqlite3.connect(db_path, cached_statements=256, check_same_thread=False,
+                                   uri=db_path.startswith('file:'))
+            shared = _CONN_CACHE[conn_key] = (conn, threading.Lock())
+            _CONN_USERS[conn_key] = 0
+        _CONN_USERS[conn_key] += 1
+        return shared
+
+def _release_connection(conn_key: Hashable) -> None:
+    """
+    Release a shared connection, closing it once no instance uses it.
+    
+    When no database is left open, the memoised derived keys are dropped too.
+    
+    Args:
+        conn_key (Hashable): Key the connection was acquired with
+    """
+    with _CONN_LOCK:
+        _CONN_USERS[conn_key] -= 1
+        if _CONN_USERS[conn_key] == 0:
+            del _CONN_USERS[conn_key]
+            _CONN_CACHE.pop(conn_key)[0].close()
+            if not _CONN_CACHE:
+                _derive_key.cache_clear()
+
+# Statements are kept as constants so every call reuses the same text,
+# and with it sqlite's prepared-statement cache entry
+_SQL_INSERT_ACCOUNT = '''
+    INSERT INTO accounts (name, username, password, otp_secret)
+    VALUES (?, ?, ?, ?)
+'''
+_SQL_UPDATE_ACCOUNT = '''
+    UPDATE accounts 
+    SET name=?, username=?, password=?, otp_secret=?, updated_at=CURRENT_TIMESTAMP
+    WHERE id=?
+'''
+_SQL_SELECT_ALL = '''
+    SELECT id, name, username, password, otp_secret, created_at, updated_at
+    FROM accounts
+'''
+_SQL_COUNT = 'SELECT COUNT(*) FROM accounts'
+_SQL_DELETE = 'DELETE FROM accounts WHERE id=?'
+
+# PBKDF2 rounds for new databases; existing ones keep the count stored in
+# their config, or this default if they predate it being stored
+DEFAULT_KDF_ITERATIONS = 480000
+
+@lru_cache(maxsize=8)
+def _derive_key(master_password_hash: str, salt: bytes, iterations: int) -> bytes:
+    """
+    Derive the Fernet key for a master password and salt.
+    
+    Results are memoised while any database is open, so reopening one in
+    the same session skips the PBKDF2 rounds. Only called once the password is validated.
+    Keys stay in this process's memory; they are never written to disk or
+    handed to other processes.
+    
+    Args:
+        master_password_hash (str): Hash of the master password
+        salt (bytes): Salt stored in the database
+        iterations (int): Number of PBKDF2 rounds
+        
+    Returns:
+        bytes: URL-safe base64 encoded Fernet key
+    """
+    raw_key = pbkdf2_hmac('sha256', master_password_hash.encode(), salt, iterations, 32)
+    return base64.urlsafe_b64encode(raw_key)
+
 class DatabaseManager:
     """Handles all database operations including encryption and account management."""
     
-    def __init__(self, master_password_hash: str, db_path: str = 'passwords.db'):
+    def __init__(self, master_password_hash: str, db_path: str = 'passwords.db',
+                 kdf_iterations: int = DEFAULT_KDF_ITERATIONS):
         """
         Initialize database connection and setup.
         
         Args:
             master_password_hash (str): Hash of the master password
             db_path (str): Path to the SQLite database file
+            kdf_iterations (int): PBKDF2 rounds for a new database; ignored
+                when opening an existing one
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.kdf_iterations = kdf_iterations
+        # Resolved once, so a later chdir can't change which connection close() releases
+        self._conn_key = _connection_key(db_path)
+        self.conn, self._write_lock = _acquire_connection(self._conn_key, db_path)
         self.cursor = self.conn.cursor()
         self.master_password_hash = master_password_hash
         
-        self._setup_database()
-        self._validate_or_initialize_master_password()
-        self._setup_encryption()
+        try:
+            self._setup_database()
+            self._validate_or_initialize_master_password()
+            self._setup_encryption()
+        except Exception:
+            # Don't leave the connection (and its WAL files) open on failure
+            _release_connection(self._conn_key)
+            raise
         
     def _setup_database(self) -> None:
-        """Create necessary database tables if they don't exist."""
+        """Configure the connection and create tables and indices if they don't exist."""
         try:
+            # WAL appends on commit instead of rewriting pages and syncing each time
+            self.cursor.execute('PRAGMA journal_mode=WAL')
+            self.cursor.execute('PRAGMA synchronous=NORMAL')
+            self.cursor.execute('PRAGMA temp_store=MEMORY')
+            
             self.cursor.execute('''
                 CREATE TABLE IF NOT EXISTS config (
                     key TEXT PRIMARY KEY,
@@ -48,12 +208,14 @@ class DatabaseManager:
                     id INTEGER PRIMARY KEY,
                     name TEXT NOT NULL,
                     username TEXT NOT NULL,
-                    password TEXT NOT NULL,
-                    otp_secret TEXT,
+                    password BLOB NOT NULL,
+                    otp_secret BLOB,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+            
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_accounts_name ON accounts(name)')
             self.conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Database setup failed: {e}")
@@ -81,6 +243,8 @@ class DatabaseManager:
             salt = os.urandom(16)
             self.cursor.execute('INSERT INTO config (key, value) VALUES (?, ?)',
                               ('salt', base64.b64encode(salt).decode()))
+            self.cursor.execute('INSERT INTO config (key, value) VALUES (?, ?)',
+                              ('kdf_iterations', str(self.kdf_iterations)))
             self.conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Master password initialization failed: {e}")
@@ -96,7 +260,8 @@ class DatabaseManager:
         Raises:
             ValueError: If the master password is invalid
         """
-        if stored_hash != self.master_password_hash:
+        # Constant-time comparison so response timing doesn't leak the stored hash
+        if not hmac.compare_digest(stored_hash.encode(), self.master_password_hash.encode()):
             logger.warning("Invalid master password attempt")
             raise ValueError("Invalid master password")
 
@@ -114,18 +279,57 @@ class DatabaseManager:
                                   ('salt', base64.b64encode(salt).decode()))
                 self.conn.commit()
 
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=480000,
-            )
-            key = base64.urlsafe_b64encode(kdf.derive(self.master_password_hash.encode()))
+            self.cursor.execute('SELECT value FROM config WHERE key = "kdf_iterations"')
+            result = self.cursor.fetchone()
+            iterations = int(result[0]) if result else DEFAULT_KDF_ITERATIONS
+            key = _derive_key(self.master_password_hash, salt, iterations)
+            # Fernet stays available to read rows written before AES-GCM storage
             self.fernet = Fernet(key)
+            self.aesgcm = None
+            if AES_GCM_SUPPORTED:
+                # A separate subkey, so the Fernet key is never reused for another cipher
+                subkey = HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                              info=_AES_GCM_KEY_INFO).derive(base64.urlsafe_b64decode(key))
+                self.aesgcm = AESGCM(subkey)
         except Exception as e:
             logger.error(f"Encryption setup failed: {e}")
             raise
 
+    def _encrypt(self, value: str) -> bytes:
+        """
+        Encrypt a value for storage.
+        
+        Uses AES-GCM with raw bytes, which is about a quarter smaller than a
+        base64 Fernet token, or Fernet if the backend lacks AES-GCM.
+        
+        Args:
+            value (str): Plaintext to encrypt
+            
+        Returns:
+            bytes: Stored ciphertext
+        """
+        if self.aesgcm is None:
+            return self.fernet.encrypt(value.encode())
+        nonce = os.urandom(_AES_GCM_NONCE_SIZE)
+        return _AES_GCM_VERSION + nonce + self.aesgcm.encrypt(nonce, value.encode(), None)
+
+    def _decrypt(self, token: Union[bytes, str]) -> str:
+        """
+        Decrypt a stored value written by _encrypt or by an older version.
+        
+        Args:
+            token (Union[bytes, str]): AES-GCM BLOB, or a Fernet token as BLOB or TEXT
+            
+        Returns:
+            str: Decrypted plaintext
+        """
+        if isinstance(token, bytes) and token[:1] == _AES_GCM_VERSION:
+            if self.aesgcm is None:
+                raise ValueError("AES-GCM is not available to decrypt this value")
+            nonce_end = 1 + _AES_GCM_NONCE_SIZE
+            return self.aesgcm.decrypt(token[1:nonce_end], token[nonce_end:], None).decode()
+        return self.fernet.decrypt(token).decode()
+
     def add_account(self, name: str, username: str, password: str, 
                    otp_secret: Optional[str] = None) -> int:
         """
@@ -144,45 +348,91 @@ class DatabaseManager:
             sqlite3.Error: If database operation fails
         """
         try:
-            encrypted_password = self.fernet.encrypt(password.encode()).decode()
-            encrypted_otp = (self.fernet.encrypt(otp_secret.encode()).decode() 
-                           if otp_secret else None)
+            encrypted_password = self._encrypt(password)
+            encrypted_otp = self._encrypt(otp_secret) if otp_secret else None
             
-            self.cursor.execute('''
-                INSERT INTO accounts (name, username, password, otp_secret)
-                VALUES (?, ?, ?, ?)
-            ''', (name, username, encrypted_password, encrypted_otp))
-            self.conn.commit()
-            return self.cursor.lastrowid
+            with self._write_lock:
+                self.cursor.execute(_SQL_INSERT_ACCOUNT,
+                                    (name, username, encrypted_password, encrypted_otp))
+                self.conn.commit()
+                return self.cursor.lastrowid
         except sqlite3.Error as e:
             logger.error(f"Failed to add account {name}: {e}")
             raise
 
-    def get_accounts(self) -> List[Dict]:
+    def add_accounts_bulk(self, accounts: Iterable[Tuple[str, str, str, Optional[str]]]) -> None:
         """
-        Retrieve all accounts from the database.
+        Add several accounts in a single transaction.
+        
+        Args:
+            accounts (Iterable[Tuple]): (name, username, password, otp_secret) tuples,
+                with otp_secret optional (None or empty)
+            
+        Raises:
+            sqlite3.Error: If database operation fails
+        """
+        encrypt = self._encrypt
+        payload = [(name, username, encrypt(password),
+                    encrypt(otp_secret) if otp_secret else None)
+                   for name, username, password, otp_secret in accounts]
+        try:
+            # The connection context commits, or rolls back the whole batch on error
+            with self._write_lock, self.conn, closing(self.conn.cursor()) as cursor:
+                cursor.executemany(_SQL_INSERT_ACCOUNT, payload)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to add {len(payload)} accounts: {e}")
+            raise
+
+    def count_accounts(self) -> int:
+        """
+        Count the stored accounts without decrypting them.
         
         Returns:
-            List[Dict]: List of account dictionaries
+            int: Number of rows in the accounts table
         """
         try:
-            self.cursor.execute('SELECT * FROM accounts')
-            accounts = self.cursor.fetchall()
-            decrypted_accounts = []
-            
-            for account in accounts:
-                try:
-                    decrypted_account = self._decrypt_account(account)
-                    if decrypted_account:
-                        decrypted_accounts.append(decrypted_account)
-                except Exception as e:
-                    logger.error(f"Failed to decrypt account {account[1]}: {e}")
-                    continue
-                    
-            return decrypted_accounts
+            self.cursor.execute(_SQL_COUNT)
+            return self.cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Failed to count accounts: {e}")
+            raise
+
+    def iter_accounts(self) -> Iterator[Dict]:
+        """
+        Iterate over all accounts, fetching and decrypting rows in batches.
+        
+        Rows that fail to decrypt are logged and skipped.
+        
+        Yields:
+            Dict: Account dictionary
+        """
+        # A dedicated cursor, so other queries can run while this one is consumed
+        cursor = self.conn.cursor()
+        cursor.arraysize = 200
+        try:
+            cursor.execute(_SQL_SELECT_ALL)
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for row in rows:
+                    account = self._decrypt_account(row)
+                    if account:
+                        yield account
         except sqlite3.Error as e:
             logger.error(f"Failed to retrieve accounts: {e}")
             raise
+        finally:
+            cursor.close()
+
+    def get_accounts(self) -> List[Dict]:
+        """
+        Retrieve all accounts from the database.
+        
+        Returns:
+            List[Dict]: List of account dictionaries
+        """
+        return list(self.iter_accounts())
 
     def _decrypt_account(self, account: tuple) -> Optional[Dict]:
         """
@@ -195,9 +445,9 @@ class DatabaseManager:
             Optional[Dict]: Decrypted account information or None if decryption fails
         """
         try:
-            decrypted_password = self.fernet.decrypt(account[3].encode()).decode()
-            decrypted_otp = (self.fernet.decrypt(account[4].encode()).decode() 
-                            if account[4] else None)
+            # Older databases hold Fernet tokens, as BLOBs or TEXT
+            decrypted_password = self._decrypt(account[3])
+            decrypted_otp = self._decrypt(account[4]) if account[4] else None
             
             return {
                 'id': account[0],
@@ -228,16 +478,13 @@ class DatabaseManager:
             sqlite3.Error: If database operation fails
         """
         try:
-            encrypted_password = self.fernet.encrypt(password.encode()).decode()
-            encrypted_otp = (self.fernet.encrypt(otp_secret.encode()).decode() 
-                           if otp_secret else None)
+            encrypted_password = self._encrypt(password)
+            encrypted_otp = self._encrypt(otp_secret) if otp_secret else None
             
-            self.cursor.execute('''
-                UPDATE accounts 
-                SET name=?, username=?, password=?, otp_secret=?, updated_at=CURRENT_TIMESTAMP
-                WHERE id=?
-            ''', (name, username, encrypted_password, encrypted_otp, id))
-            self.conn.commit()
+            with self._write_lock:
+                self.cursor.execute(_SQL_UPDATE_ACCOUNT,
+                                    (name, username, encrypted_password, encrypted_otp, id))
+                self.conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Failed to update account {name}: {e}")
             raise
@@ -253,16 +500,29 @@ class DatabaseManager:
             sqlite3.Error: If database operation fails
         """
         try:
-            self.cursor.execute('DELETE FROM accounts WHERE id=?', (id,))
-            self.conn.commit()
+            with self._write_lock:
+                self.cursor.execute(_SQL_DELETE, (id,))
+                self.conn.commit()
         except sqlite3.Error as e:
             logger.error(f"Failed to delete account {id}: {e}")
             raise
 
     def close(self) -> None:
-        """Close the database connection."""
+        """
+        Close the database connection and drop the encryption keys.
+        
+        The memoised derived key is dropped once no database is left open.
+        """
+        if self.conn is None:
+            return
         try:
-            self.conn.close()
+            self.cursor.close()
+            _release_connection(self._conn_key)
         except sqlite3.Error as e:
             logger.error(f"Failed to close database connection: {e}")
             raise
+        finally:
+            self.conn = None
+            self.fernet = None
+            self.aesgcm = None
+            self.master_password_hash = None
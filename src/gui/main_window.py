@@ -2,17 +2,84 @@
 Main window implementation for the password manager GUI.
 """
 import sys
+import base64
+import csv
 import hashlib
-import pyotp
-from typing import Optional, Dict
+import hmac
+import io
+import struct
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Iterator, List
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QApplication,
-                              QMessageBox, QMenu, QStyle, QHBoxLayout, QLabel)
-from PySide6.QtCore import QTimer, Qt
+                              QMessageBox, QMenu, QStyle, QHBoxLayout, QLabel,
+                              QTableWidgetItem)
+from PySide6.QtCore import QTimer, Qt, QObject, QRunnable, QThreadPool, QEventLoop, Signal
 
 from src.database.database_manager import DatabaseManager
 from src.gui.widgets import StyledButton, CustomTableWidget, LoginDialog, AddAccountDialog
 from src.gui.styles import DARK_STYLE
 
+def _decode_otp_secret(secret: str) -> bytes:
+    """
+    Decode a base32 OTP secret into HMAC key bytes.
+    
+    Args:
+        secret (str): Base32 secret, padding optional
+        
+    Returns:
+        bytes: Decoded key
+    """
+    padding = -len(secret) % 8
+    return base64.b32decode(secret + '=' * padding, casefold=True)
+
+def _totp_code(key: bytes, counter: int, digits: int = 6) -> str:
+    """
+    Compute a TOTP code (RFC 6238, HMAC-SHA1) for a time-step counter.
+    
+    Args:
+        key (bytes): Decoded OTP secret
+        counter (int): Number of 30 second steps since the epoch
+        digits (int): Length of the code
+        
+    Returns:
+        str: Zero-padded OTP code
+    """
+    digest = hmac.new(key, struct.pack('>Q', counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    code = int.from_bytes(digest[offset:offset + 4], 'big') & 0x7FFFFFFF
+    return str(code % 10 ** digits).zfill(digits)
+
+class DatabaseOpenSignals(QObject):
+    """Signals emitted by DatabaseOpenTask."""
+    
+    finished = Signal()
+
+class DatabaseOpenTask(QRunnable):
+    """Opens a DatabaseManager on a worker thread, away from the GUI event loop."""
+    
+    def __init__(self, master_password_hash: str):
+        """
+        Initialize the task.
+        
+        Args:
+            master_password_hash (str): Hash of the master password
+        """
+        super().__init__()
+        self.setAutoDelete(False)
+        self.signals = DatabaseOpenSignals()
+        self.master_password_hash = master_password_hash
+        self.db: Optional[DatabaseManager] = None
+        self.error: Optional[Exception] = None
+        
+    def run(self) -> None:
+        """Open the database, recording either the manager or the error raised."""
+        try:
+            self.db = DatabaseManager(self.master_password_hash)
+        except Exception as e:
+            self.error = e
+        self.signals.finished.emit()
+
 class PasswordManager(QMainWindow):
     """Main window class for the password manager application."""
     
@@ -20,6 +87,10 @@ class PasswordManager(QMainWindow):
         """Initialize the password manager window."""
         super().__init__()
         self.db: Optional[DatabaseManager] = None
+        self._totp_cache: Dict[int, bytes] = {}  # account id -> decoded secret
+        self._otp_keys: Dict[int, bytes] = {}  # table row -> decoded secret
+        self._otp_counters: Dict[int, int] = {}
+        self._last_totp_bucket = -1
         self.authenticate()
         
     def authenticate(self) -> None:
@@ -49,7 +120,7 @@ class PasswordManager(QMainWindow):
         self.setStyleSheet(DARK_STYLE)
         
         # Initialize database
-        self.db = DatabaseManager(master_password_hash)
+        self.db = self._open_database(master_password_hash)
         
         # Main widget and layout
         central_widget = QWidget()
@@ -70,6 +141,34 @@ class PasswordManager(QMainWindow):
         self.load_accounts()
         self._setup_otp_timer()
 
+    def _open_database(self, master_password_hash: str) -> DatabaseManager:
+        """
+        Open the database on a worker thread so the key derivation doesn't freeze the UI.
+        
+        Args:
+            master_password_hash (str): Hash of the master password
+            
+        Returns:
+            DatabaseManager: The opened database
+            
+        Raises:
+            ValueError: If the master password is invalid
+        """
+        task = DatabaseOpenTask(master_password_hash)
+        loop = QEventLoop()
+        task.signals.finished.connect(loop.quit)
+        
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            QThreadPool.globalInstance().start(task)
+            loop.exec()
+        finally:
+            QApplication.restoreOverrideCursor()
+            
+        if task.error:
+            raise task.error
+        return task.db
+
     def _setup_header(self, layout: QVBoxLayout) -> None:
         """Setup the header section with title and add button."""
         header_layout = QHBoxLayout()
@@ -142,6 +241,7 @@ class PasswordManager(QMainWindow):
             if reply == QMessageBox.Yes:
                 account_id = self.table.item(row, 0).data(Qt.UserRole)
                 self.db.delete_account(account_id)
+                self._totp_cache.pop(account_id, None)
                 self.load_accounts()
 
     def _handle_copy_action(self, action, row: int, col: int) -> None:
@@ -161,18 +261,28 @@ class PasswordManager(QMainWindow):
             elif action.text() == "Copy Raw Value":
                 clipboard.setText(self.table.item(row, col).data(Qt.UserRole))
             elif action.text() == "Copy Row (Tab separated)":
-                row_data = []
-                for c in range(self.table.columnCount()):
-                    row_data.append(self.table.item(row, c).data(Qt.UserRole))
-                clipboard.setText('\t'.join(row_data))
+                clipboard.setText('\t'.join(self._row_values(row)))
             elif action.text() == "Copy Row (CSV format)":
-                row_data = []
-                for c in range(self.table.columnCount()):
-                    value = self.table.item(row, c).data(Qt.UserRole)
-                    if ',' in value:
-                        value = f'"{value}"'
-                    row_data.append(value)
-                clipboard.setText(','.join(row_data))
+                # The csv module quotes commas, quotes and newlines correctly
+                buffer = io.StringIO()
+                csv.writer(buffer).writerow(self._row_values(row))
+                clipboard.setText(buffer.getvalue().rstrip('\r\n'))
+
+    def _row_values(self, row: int) -> List[str]:
+        """
+        Get the raw values of a table row.
+        
+        Args:
+            row (int): Row index
+            
+        Returns:
+            List[str]: Account name, username, password and OTP secret
+        """
+        # The name column's user data is the account id, so use its text
+        values = [self.table.item(row, 0).text()]
+        values.extend(self.table.item(row, c).data(Qt.UserRole)
+                      for c in range(1, self.table.columnCount()))
+        return values
 
     def add_account(self) -> None:
         """Handle adding a new account."""
@@ -195,11 +305,32 @@ class PasswordManager(QMainWindow):
 
     def load_accounts(self) -> None:
         """Load accounts from database into table."""
-        accounts = self.db.get_accounts()
-        self.table.setRowCount(len(accounts))
+        self._otp_keys.clear()
+        self._otp_counters.clear()
         
-        for row, account in enumerate(accounts):
-            self._update_table_row(row, account)
+        with self._batched_table_updates():
+            self.table.setRowCount(self.db.count_accounts())
+            
+            row = -1
+            for row, account in enumerate(self.db.iter_accounts()):
+                self._update_table_row(row, account)
+            
+            # Drop trailing rows left by accounts that failed to decrypt
+            self.table.setRowCount(row + 1)
+
+    @contextmanager
+    def _batched_table_updates(self) -> Iterator[None]:
+        """Suspend sorting, repaints and signals on the table while it is modified."""
+        sorting_enabled = self.table.isSortingEnabled()
+        self.table.setSortingEnabled(False)
+        self.table.setUpdatesEnabled(False)
+        self.table.blockSignals(True)
+        try:
+            yield
+        finally:
+            self.table.blockSignals(False)
+            self.table.setUpdatesEnabled(True)
+            self.table.setSortingEnabled(sorting_enabled)
 
     def _update_table_row(self, row: int, account: Dict) -> None:
         """
@@ -226,9 +357,14 @@ class PasswordManager(QMainWindow):
         
         # OTP
         if account['otp_secret']:
-            totp = pyotp.TOTP(account['otp_secret'])
-            otp_value = totp.now()
-            otp_item = QTableWidgetItem(otp_value)
+            # Decode the secret once per account; ticks only run the HMAC
+            key = self._totp_cache.get(account['id'])
+            if key is None:
+                key = self._totp_cache[account['id']] = _decode_otp_secret(account['otp_secret'])
+            counter = int(time.time()) // 30
+            self._otp_keys[row] = key
+            self._otp_counters[row] = counter
+            otp_item = QTableWidgetItem(_totp_code(key, counter))
             otp_item.setData(Qt.UserRole, account['otp_secret'])
             self.table.setItem(row, 3, otp_item)
         else:
@@ -237,9 +373,32 @@ class PasswordManager(QMainWindow):
             self.table.setItem(row, 3, otp_item)
 
     def update_otp_codes(self) -> None:
-        """Update OTP codes in the table."""
-        for row in range(self.table.rowCount()):
-            otp_item = self.table.item(row, 3)
-            if otp_item and otp_item.data(Qt.UserRole):
-                totp = pyotp.TOTP(otp_item.data(Qt.UserRole))
-                otp_item.setText(totp.now())
+        """Update OTP codes in the table once their 30 second window has passed."""
+        counter = int(time.time()) // 30
+        # Nothing changes within a window, and nothing needs painting while hidden
+        if counter == self._last_totp_bucket or not self.isVisible():
+            return
+        self._last_totp_bucket = counter
+        
+        with self._batched_table_updates():
+            for row, key in self._otp_keys.items():
+                if self._otp_counters[row] != counter:
+                    self.table.item(row, 3).setText(_totp_code(key, counter))
+                    self._otp_counters[row] = counter
+
+    def closeEvent(self, event) -> None:
+        """
+        Release decrypted data and close the database when the window closes.
+        
+        Args:
+            event: The close event
+        """
+        if self.db:
+            self.otp_timer.stop()
+            # Drop the plaintext held by table items and the decoded OTP keys
+            self.table.clearContents()
+            self._totp_cache.clear()
+            self._otp_keys.clear()
+            self.db.close()
+            self.db = None
+        event.accept()
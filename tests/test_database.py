@@ -5,7 +5,14 @@ import unittest
 import os
 import tempfile
 import hashlib
-from src.database.database_manager import DatabaseManager
+import base64
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from src.database.database_manager import DatabaseManager, _derive_key
+
+# A cheap KDF so each test's database opens quickly
+TEST_KDF_ITERATIONS = 1000
 
 class TestDatabaseManager(unittest.TestCase):
     """Test cases for DatabaseManager class."""
@@ -15,7 +22,8 @@ class TestDatabaseManager(unittest.TestCase):
         self.test_db_fd, self.test_db_path = tempfile.mkstemp()
         self.master_password = "test_password"
         self.master_password_hash = hashlib.sha256(self.master_password.encode()).hexdigest()
-        self.db = DatabaseManager(self.master_password_hash, self.test_db_path)
+        self.db = DatabaseManager(self.master_password_hash, self.test_db_path,
+                                  TEST_KDF_ITERATIONS)
 
     def tearDown(self):
         """Clean up test environment after each test."""
@@ -36,6 +44,20 @@ class TestDatabaseManager(unittest.TestCase):
         self.assertEqual(accounts[0]['password'], "test_pass")
         self.assertEqual(accounts[0]['otp_secret'], "test_otp")
 
+    def test_add_accounts_bulk(self):
+        """Test adding several accounts at once."""
+        self.db.add_accounts_bulk([
+            ("Service A", "user_a", "pass_a", "otp_a"),
+            ("Service B", "user_b", "pass_b", None),
+        ])
+        
+        accounts = self.db.get_accounts()
+        self.assertEqual(len(accounts), 2)
+        self.assertEqual(accounts[0]['password'], "pass_a")
+        self.assertEqual(accounts[0]['otp_secret'], "otp_a")
+        self.assertEqual(accounts[1]['name'], "Service B")
+        self.assertIsNone(accounts[1]['otp_secret'])
+
     def test_update_account(self):
         """Test updating an account."""
         # Add and then update test account
@@ -60,6 +82,66 @@ class TestDatabaseManager(unittest.TestCase):
         accounts = self.db.get_accounts()
         self.assertEqual(len(accounts), 0)
 
+    def test_iter_accounts(self):
+        """Test iterating and counting accounts."""
+        for i in range(3):
+            self.db.add_account(f"Service {i}", f"user_{i}", f"pass_{i}")
+        
+        self.assertEqual(self.db.count_accounts(), 3)
+        accounts = list(self.db.iter_accounts())
+        self.assertEqual([a['password'] for a in accounts], ["pass_0", "pass_1", "pass_2"])
+        self.assertEqual(accounts, self.db.get_accounts())
+
+    def test_close_releases_key(self):
+        """Test that closing the last open database drops the encryption keys."""
+        self.db.close()
+        self.assertIsNone(self.db.fernet)
+        self.assertIsNone(self.db.aesgcm)
+        self.assertIsNone(self.db.master_password_hash)
+        self.assertEqual(_derive_key.cache_info().currsize, 0)
+
+    def test_shared_connection(self):
+        """Test that instances on the same file share one connection until the last closes."""
+        other = DatabaseManager(self.master_password_hash, self.test_db_path)
+        self.assertIs(other.conn, self.db.conn)
+        other.close()
+        
+        # Still usable by the remaining instance
+        self.db.add_account("Test Service", "test_user", "test_pass")
+        self.assertEqual(len(self.db.get_accounts()), 1)
+
+    def test_close_after_chdir(self):
+        """Test that a database opened by relative path closes after the working directory changes."""
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                db = DatabaseManager(self.master_password_hash, 'passwords.db',
+                                     TEST_KDF_ITERATIONS)
+            finally:
+                os.chdir(cwd)
+            db.close()
+            self.assertIsNone(db.conn)
+
+    def test_in_memory_databases_are_private(self):
+        """Test that ':memory:' databases stay in memory and don't share a connection."""
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                first = DatabaseManager(self.master_password_hash, ':memory:', TEST_KDF_ITERATIONS)
+                second = DatabaseManager(self.master_password_hash, ':memory:', TEST_KDF_ITERATIONS)
+                try:
+                    self.assertIsNot(first.conn, second.conn)
+                    first.add_account("Test Service", "test_user", "test_pass")
+                    self.assertEqual(second.count_accounts(), 0)
+                finally:
+                    first.close()
+                    second.close()
+                self.assertEqual(os.listdir(tmp_dir), [])
+            finally:
+                os.chdir(cwd)
+
     def test_invalid_master_password(self):
         """Test authentication with invalid master password."""
         wrong_password = "wrong_password"
@@ -81,11 +163,80 @@ class TestDatabaseManager(unittest.TestCase):
         # Check that encrypted data is different from original
         self.assertNotEqual(encrypted_data[0], "test_pass")
         self.assertNotEqual(encrypted_data[1], "test_otp")
+        self.assertIsInstance(encrypted_data[0], bytes)
+        self.assertIsInstance(encrypted_data[1], bytes)
         
         # Verify data can be decrypted correctly
         accounts = self.db.get_accounts()
         self.assertEqual(accounts[0]['password'], "test_pass")
         self.assertEqual(accounts[0]['otp_secret'], "test_otp")
 
+    def test_wal_journal_mode(self):
+        """Test that the database uses write-ahead logging."""
+        self.db.cursor.execute('PRAGMA journal_mode')
+        self.assertEqual(self.db.cursor.fetchone()[0], "wal")
+
+    def test_legacy_text_ciphertext(self):
+        """Test that tokens stored as TEXT by older versions still decrypt."""
+        token = self.db.fernet.encrypt(b"legacy_pass").decode()
+        self.db.cursor.execute('INSERT INTO accounts (name, username, password) VALUES (?, ?, ?)',
+                               ("Legacy Service", "legacy_user", token))
+        self.db.conn.commit()
+        
+        accounts = self.db.get_accounts()
+        self.assertEqual(accounts[0]['password'], "legacy_pass")
+        self.assertIsNone(accounts[0]['otp_secret'])
+
+    def test_aes_gcm_storage(self):
+        """Test that new values are stored as AES-GCM and legacy Fernet BLOBs still decrypt."""
+        self.db.add_account("Test Service", "test_user", "test_pass", "JBSWY3DPEHPK3PXP")
+        self.db.cursor.execute('SELECT password, otp_secret FROM accounts')
+        for value in self.db.cursor.fetchone():
+            self.assertIsInstance(value, bytes)
+            self.assertEqual(value[:1], b'\x01')
+        
+        token = self.db.fernet.encrypt(b"legacy_pass")
+        self.db.cursor.execute('INSERT INTO accounts (name, username, password) VALUES (?, ?, ?)',
+                               ("Legacy Service", "legacy_user", token))
+        self.db.conn.commit()
+        
+        passwords = {account['name']: account['password'] for account in self.db.get_accounts()}
+        self.assertEqual(passwords, {"Test Service": "test_pass", "Legacy Service": "legacy_pass"})
+
+    def test_reopen_reuses_derived_key(self):
+        """Test that reopening a database in the same process skips the KDF."""
+        self.db.add_account("Test Service", "test_user", "test_pass")
+        misses = _derive_key.cache_info().misses
+        
+        reopened = DatabaseManager(self.master_password_hash, self.test_db_path)
+        try:
+            self.assertEqual(_derive_key.cache_info().misses, misses)
+            self.assertEqual(reopened.get_accounts()[0]['password'], "test_pass")
+        finally:
+            reopened.close()
+
+    def test_reopen_uses_stored_kdf_iterations(self):
+        """Test that an existing database reopens with the iteration count it was created with."""
+        self.db.add_account("Test Service", "test_user", "test_pass")
+        
+        reopened = DatabaseManager(self.master_password_hash, self.test_db_path,
+                                   TEST_KDF_ITERATIONS * 2)
+        try:
+            self.assertEqual(reopened.get_accounts()[0]['password'], "test_pass")
+        finally:
+            reopened.close()
+
+    def test_key_derivation_matches_cryptography(self):
+        """Test that the stdlib KDF derives the same key as cryptography's PBKDF2HMAC."""
+        self.db.cursor.execute('SELECT value FROM config WHERE key = "salt"')
+        salt = base64.b64decode(self.db.cursor.fetchone()[0])
+        kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt,
+                         iterations=TEST_KDF_ITERATIONS)
+        reference = Fernet(base64.urlsafe_b64encode(kdf.derive(self.master_password_hash.encode())))
+        
+        # Data written before the switch must still decrypt, and vice versa
+        self.assertEqual(reference.decrypt(self.db.fernet.encrypt(b"test_pass")), b"test_pass")
+        self.assertEqual(self.db.fernet.decrypt(reference.encrypt(b"old_pass")), b"old_pass")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,52 @@
+"""
+Unit tests for the TOTP helpers used by the main window.
+"""
+import unittest
+import base64
+import binascii
+import pyotp
+from src.gui.main_window import _decode_otp_secret, _totp_code
+
+class TestTotp(unittest.TestCase):
+    """Test cases for _decode_otp_secret and _totp_code."""
+
+    def test_rfc6238_sha1_vectors(self):
+        """Test the SHA-1 test vectors from RFC 6238, Appendix B."""
+        key = b"12345678901234567890"
+        vectors = {
+            59: "94287082",
+            1111111109: "07081804",
+            1111111111: "14050471",
+            1234567890: "89005924",
+            2000000000: "69279037",
+            20000000000: "65353130",
+        }
+        for timestamp, expected in vectors.items():
+            with self.subTest(timestamp=timestamp):
+                self.assertEqual(_totp_code(key, timestamp // 30, digits=8), expected)
+
+    def test_matches_pyotp(self):
+        """Test that codes match pyotp for padded, unpadded and lower-case secrets."""
+        secrets = [
+            "JBSWY3DPEHPK3PXP",
+            "jbswy3dpehpk3pxp",
+            base64.b32encode(b"12345678901234567890").decode(),
+            base64.b32encode(b"1234567890123456789012345").decode(),
+            base64.b32encode(b"0123456789").decode(),
+            base64.b32encode(b"0123456789").decode().rstrip("="),
+            base64.b32encode(b"abc").decode(),
+        ]
+        for secret in secrets:
+            totp = pyotp.TOTP(secret)
+            key = _decode_otp_secret(secret)
+            for timestamp in (0, 59, 1111111109, 1700000000):
+                with self.subTest(secret=secret, timestamp=timestamp):
+                    self.assertEqual(_totp_code(key, timestamp // 30), totp.at(timestamp))
+
+    def test_invalid_secret(self):
+        """Test that a secret that isn't base32 is rejected."""
+        with self.assertRaises(binascii.Error):
+            _decode_otp_secret("not a secret!")
+
+if __name__ == '__main__':
+    unittest.main()